@@ -1,34 +1,54 @@
-import json
-from collections import defaultdict
+import argparse
+import orjson
 from datetime import datetime
 
 def load_json(filename):
     try:
-        with open(filename, 'r') as f:
-            return json.load(f)
+        with open(filename, 'rb') as f:
+            return orjson.loads(f.read())
     except FileNotFoundError:
         print(f"File not found: {filename}")
         return {}
 
+def load_jsonl(filename):
+    # Yield one record per line so large files are never fully materialized
+    try:
+        with open(filename, 'rb') as f:
+            for line in f:
+                yield orjson.loads(line)
+    except FileNotFoundError:
+        print(f"File not found: {filename}")
+
 def combine_kubernetes_data():
-    # Load all JSON files
+    # Load all JSON files; deployments and pods are streamed line by line
     clusters_data = load_json('clusters.json')
     nodes_data = load_json('nodes.json')
     namespaces_data = load_json('namespaces.json')
-    deployments_data = load_json('deployments.json')
-    pods_data = load_json('pods.json')
+    deployments_data = load_jsonl('deployments.jsonl')
+    pods_data = load_jsonl('pods.jsonl')
 
-    # Create the master structure
-    master_data = defaultdict(lambda: {
-        'info': {},
-        'nodes': [],
-        'namespaces': defaultdict(lambda: {'deployments': defaultdict(lambda: {'info': {}, 'pods': []})})
-    })
+    # Create the master structure, with flat indexes into its nested levels
+    master_data = {}
+    namespace_index = {}
+    deployment_index = {}
+
+    def get_cluster(cluster_id):
+        cluster = master_data.get(cluster_id)
+        if cluster is None:
+            cluster = master_data[cluster_id] = {'info': {}, 'nodes': [], 'namespaces': {}}
+        return cluster
+
+    def get_namespace(cluster_id, namespace_name):
+        key = (cluster_id, namespace_name)
+        namespace = namespace_index.get(key)
+        if namespace is None:
+            namespaces = get_cluster(cluster_id)['namespaces']
+            namespace = namespace_index[key] = namespaces.setdefault(namespace_name, {'deployments': {}})
+        return namespace
 
     # Process clusters
     for cluster in clusters_data.get('clusters', []):
-        cluster_id = cluster['id']
-        master_data[cluster_id]['info'] = {
+        get_cluster(cluster['id'])['info'] = {
             'name': cluster['name'],
             'type': cluster['type'],
             'labels': cluster.get('labels', {})
@@ -36,93 +56,97 @@ def combine_kubernetes_data():
 
     # Process nodes
     for cluster_id, cluster_nodes in nodes_data.items():
-        for node in cluster_nodes.get('nodes', []):
-            master_data[cluster_id]['nodes'].append({
+        get_cluster(cluster_id)['nodes'].extend(
+            {
                 'id': node['id'],
                 'name': node['name'],
                 'labels': node.get('labels', {}),
                 'taints': node.get('taints', [])
-            })
+            }
+            for node in cluster_nodes.get('nodes', [])
+        )
 
     # Process namespaces
     for namespace in namespaces_data.get('namespaces', []):
         metadata = namespace['metadata']
-        cluster_id = metadata['clusterId']
-        namespace_name = metadata['name']
-        master_data[cluster_id]['namespaces'][namespace_name].update({
+        get_namespace(metadata['clusterId'], metadata['name']).update({
             'id': metadata['id'],
             'labels': metadata.get('labels', {}),
             'annotations': metadata.get('annotations', {})
         })
 
     # Process deployments
-    for deployment in deployments_data.get('deployments', []):
-        cluster_id = deployment['clusterId']
-        namespace = deployment['namespace']
+    for deployment in deployments_data:
         deployment_id = deployment['id']
-        master_data[cluster_id]['namespaces'][namespace]['deployments'][deployment_id]['info'] = {
+        deployments = get_namespace(deployment['clusterId'], deployment['namespace'])['deployments']
+        entry = deployments.setdefault(deployment_id, {'info': {}, 'pods': []})
+        entry['info'] = {
             'name': deployment['name'],
             'created': deployment['created']
         }
+        deployment_index[deployment_id] = entry
 
-    # Process pods
-    for pod in pods_data.get('pods', []):
-        cluster_id = pod['clusterId']
-        namespace = pod['namespace']
+    # Process pods, binding the index lookup once outside the loop
+    find_deployment = deployment_index.get
+    for pod in pods_data:
         deployment_id = pod.get('deploymentId')
         
+        # Process live instances to get node information (from the last instance) and containers
+        live_instances = pod.get('liveInstances', [])
         pod_info = {
             'id': pod['id'],
             'name': pod['name'],
-            'node': None,
-            'containers': []
+            'node': live_instances[-1]['instanceId']['node'] if live_instances else None,
+            'containers': [
+                {
+                    'name': instance['containerName'],
+                    'id': instance['instanceId']['id'],
+                    'runtime': instance['instanceId']['containerRuntime']
+                }
+                for instance in live_instances
+            ]
         }
         
-        # Process live instances to get node information and containers
-        for instance in pod.get('liveInstances', []):
-            instance_id = instance['instanceId']
-            pod_info['node'] = instance_id['node']
-            pod_info['containers'].append({
-                'name': instance['containerName'],
-                'id': instance_id['id'],
-                'runtime': instance_id['containerRuntime']
-            })
-        
         if deployment_id:
-            master_data[cluster_id]['namespaces'][namespace]['deployments'][deployment_id]['pods'].append(pod_info)
+            deployment = find_deployment(deployment_id)
+            if deployment is None:
+                # Pod references a deployment that was not returned by the API
+                deployments = get_namespace(pod['clusterId'], pod['namespace'])['deployments']
+                deployment = deployments.setdefault(deployment_id, {'info': {}, 'pods': []})
+            deployment['pods'].append(pod_info)
         else:
             # Handle pods not associated with a deployment
-            if 'standalone_pods' not in master_data[cluster_id]['namespaces'][namespace]:
-                master_data[cluster_id]['namespaces'][namespace]['standalone_pods'] = []
-            master_data[cluster_id]['namespaces'][namespace]['standalone_pods'].append(pod_info)
+            namespace = get_namespace(pod['clusterId'], pod['namespace'])
+            namespace.setdefault('standalone_pods', []).append(pod_info)
 
-    return dict(master_data)
+    return master_data
 
-def save_master_json(data, filename):
-    with open(filename, 'w') as f:
-        json.dump(data, f, indent=2)
+def save_master_json(data, filename, pretty=False):
+    with open(filename, 'wb') as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0))
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Combine the fetched Kubernetes data into a single master file")
+    parser.add_argument('--pretty', action='store_true', help="indent the master JSON file for debugging")
+    args = parser.parse_args()
+
     master_data = combine_kubernetes_data()
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"kubernetes_master_data_{timestamp}.json"
-    save_master_json(master_data, filename)
+    save_master_json(master_data, filename, pretty=args.pretty)
     print(f"Master JSON file created: {filename}")
 
     # Print some statistics
     cluster_count = len(master_data)
-    total_nodes = sum(len(cluster['nodes']) for cluster in master_data.values())
-    total_namespaces = sum(len(cluster['namespaces']) for cluster in master_data.values())
-    total_deployments = sum(
-        sum(len(ns['deployments']) for ns in cluster['namespaces'].values())
-        for cluster in master_data.values()
-    )
-    total_pods = sum(
-        sum(len(deployment['pods']) for deployment in ns['deployments'].values()) +
-        len(ns.get('standalone_pods', []))
-        for cluster in master_data.values()
-        for ns in cluster['namespaces'].values()
-    )
+    total_nodes = total_namespaces = total_deployments = total_pods = 0
+    for cluster in master_data.values():
+        total_nodes += len(cluster['nodes'])
+        total_namespaces += len(cluster['namespaces'])
+        for ns in cluster['namespaces'].values():
+            total_deployments += len(ns['deployments'])
+            for deployment in ns['deployments'].values():
+                total_pods += len(deployment['pods'])
+            total_pods += len(ns.get('standalone_pods', ()))
 
     print(f"Total clusters: {cluster_count}")
     print(f"Total nodes: {total_nodes}")
@@ -1,12 +1,23 @@
 import os
+import argparse
 import asyncio
 import aiohttp
-import json
+import orjson
 import logging
+import ssl
+import time
+import itertools
+import hashlib
+from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
 import urllib.parse
 
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -18,12 +29,36 @@ load_dotenv()
 BASE_URL = os.getenv('STACKROX_API_ENDPOINT')
 API_TOKEN = os.getenv('STACKROX_API_TOKEN')
 PROXY_URL = os.getenv('PROXY_URL', 'http://localhost:8080')
+VERIFY_SSL = os.getenv('VERIFY_SSL', '').lower() in ('1', 'true', 'yes')
+
+# Cache raw API responses on disk for repeated development runs (set CACHE_API=1 to enable)
+CACHE_API = os.getenv('CACHE_API', '').lower() in ('1', 'true', 'yes')
+CACHE_DIR = Path('.cache')
+
+# Connection pool settings for the HTTP session
+CONNECTION_LIMIT = 200
+CONNECTION_LIMIT_PER_HOST = 64
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 60
 
-# Set the maximum number of concurrent API calls and retries
-MAX_CONCURRENT_REQUESTS = 100
+# Set the maximum number of concurrent API calls and retries. All calls go to one host, so
+# admitting more than the per-host pool would only queue them inside the connector.
+MAX_CONCURRENT_REQUESTS = CONNECTION_LIMIT_PER_HOST
 MAX_RETRIES = 3
 RETRY_DELAY = 1
 
+# Number of pages requested concurrently when walking paginated endpoints
+PAGE_WINDOW = 16
+
+# Response fields that may carry the total record count of a paginated endpoint
+TOTAL_COUNT_KEYS = ('totalCount', 'totalResults')
+
+# Number of image names combined into a single search query
+IMAGE_SEARCH_BATCH_SIZE = 50
+
+# Result categories requested from the search endpoint
+SEARCH_CATEGORIES = ['DEPLOYMENTS', 'IMAGES']
+
 headers = {
     "Authorization": f"Bearer {API_TOKEN}",
     "Accept": "application/json"
@@ -32,187 +67,472 @@ headers = {
 # Increase the timeout for the namespaces API call (e.g., 5 minutes)
 NAMESPACES_TIMEOUT = 300
 
-async def make_request(session, url, semaphore, params=None, timeout=None):
-    async with semaphore:
-        for attempt in range(MAX_RETRIES):
+def parse_seconds(value):
+    # Rate limit headers carry either a delay in seconds or an absolute epoch timestamp
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return None
+    if seconds > 1e9:
+        seconds -= time.time()
+    return max(seconds, 0.0)
+
+class AdaptiveLimiter:
+    """Caps in-flight requests and backs off according to the API's rate limit headers."""
+
+    def __init__(self, max_concurrent):
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self.tokens = None  # Requests left in the current rate limit window, when advertised
+        self.window_size = None  # Requests allowed per rate limit window, when advertised
+        self.window_reset_at = None  # Loop time at which the advertised window resets, when known
+        self.resume_at = 0.0
+        self.probing = True  # Send one request at a time until a response reports back
+        self.condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.release()
+
+    def can_start(self, now):
+        if now < self.resume_at or self.in_flight >= self.max_concurrent:
+            return False
+        if self.tokens is not None and self.tokens <= 0:
+            if self.window_reset_at is None or now < self.window_reset_at:
+                # Wait for the window to reset, or let a single request through to ask for fresh headers
+                return self.window_reset_at is None and self.in_flight == 0
+            # The advertised window has reset: refill it if its size is known, otherwise probe
+            self.window_reset_at = None
+            if self.window_size is not None:
+                self.tokens = self.window_size
+            else:
+                self.tokens = None
+                self.probing = True
+        if self.probing:
+            return self.in_flight == 0
+        return True
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        async with self.condition:
+            while not self.can_start(loop.time()):
+                delay = max(self.resume_at, self.window_reset_at or 0.0) - loop.time()
+                try:
+                    await asyncio.wait_for(self.condition.wait(), delay if delay > 0 else None)
+                except asyncio.TimeoutError:
+                    pass
+            self.in_flight += 1
+            if self.tokens is not None:
+                self.tokens -= 1
+
+    async def release(self):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify()
+
+    def pause(self, delay):
+        # Requests held back by the pause resume with a single probe rather than all at once
+        self.resume_at = max(self.resume_at, asyncio.get_running_loop().time() + delay)
+        self.probing = True
+
+    async def update(self, remaining, reset, limit=None):
+        async with self.condition:
+            # Any response ends probing, even one without rate limit headers
+            self.probing = False
+            try:
+                self.window_size = int(limit)
+            except (TypeError, ValueError):
+                pass
             try:
-                logger.info(f"Making request to: {url}")
+                self.tokens = int(remaining)
+            except (TypeError, ValueError):
+                pass
+            else:
+                reset_delay = parse_seconds(reset)
+                if reset_delay is None:
+                    self.window_reset_at = None
+                else:
+                    self.window_reset_at = asyncio.get_running_loop().time() + reset_delay
+            self.condition.notify_all()
+
+def get_cache_path(url, params):
+    key = hashlib.sha256((url + repr(sorted((params or {}).items()))).encode()).hexdigest()
+    return CACHE_DIR / f"{key}.json"
+
+def save_to_cache(path, body):
+    # Write to a temporary file first so an interrupted run never leaves a truncated entry
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_bytes(body)
+    os.replace(tmp_path, path)
+
+async def make_request(session, url, limiter, params=None, timeout=None):
+    cache_path = get_cache_path(url, params) if CACHE_API else None
+    if cache_path and cache_path.exists():
+        logger.debug("Using cached response for: %s", url)
+        return orjson.loads(cache_path.read_bytes())
+
+    for attempt in range(MAX_RETRIES):
+        try:
+            async with limiter:
+                logger.debug("Making request to: %s", url)
                 timeout_obj = aiohttp.ClientTimeout(total=timeout) if timeout else None
-                async with session.get(url, headers=headers, params=params, ssl=False, proxy=PROXY_URL, timeout=timeout_obj) as response:
+                async with session.get(url, params=params, proxy=PROXY_URL, timeout=timeout_obj) as response:
+                    await limiter.update(
+                        response.headers.get('X-RateLimit-Remaining'),
+                        response.headers.get('X-RateLimit-Reset'),
+                        response.headers.get('X-RateLimit-Limit')
+                    )
                     response.raise_for_status()
-                    logger.info(f"Request to {url} successful. Status: {response.status}")
-                    data = await response.json()
+                    logger.debug("Request to %s successful. Status: %s", url, response.status)
+                    body = await response.read()
+                    data = orjson.loads(body)
+                    if cache_path:
+                        save_to_cache(cache_path, body)
                     return data
-            except (aiohttp.ClientResponseError, aiohttp.ClientConnectorError, json.JSONDecodeError, asyncio.TimeoutError) as e:
-                logger.error(f"Attempt {attempt + 1} failed for URL {url}: {str(e)}")
-                if attempt == MAX_RETRIES - 1:
-                    logger.error(f"All attempts failed for URL: {url}")
-                    return None
-                retry_time = RETRY_DELAY * (2 ** attempt)
-                logger.info(f"Retrying in {retry_time} seconds...")
-                await asyncio.sleep(retry_time)
-
-async def get_paginated_data(session, url, semaphore, data_key, params=None):
-    all_data = []
-    offset = 0
+        except (aiohttp.ClientResponseError, aiohttp.ClientConnectorError, orjson.JSONDecodeError, asyncio.TimeoutError) as e:
+            logger.error("Attempt %d failed for URL %s: %s", attempt + 1, url, e)
+            if attempt == MAX_RETRIES - 1:
+                logger.error("All attempts failed for URL: %s", url)
+                return None
+            retry_time = RETRY_DELAY * (2 ** attempt)
+            if isinstance(e, aiohttp.ClientResponseError) and e.status == 429 and e.headers:
+                # Honor the server's backoff and hold back every other request as well
+                retry_after = parse_seconds(e.headers.get('Retry-After'))
+                if retry_after is not None:
+                    retry_time = retry_after
+                    limiter.pause(retry_time)
+            logger.info("Retrying in %s seconds...", retry_time)
+            await asyncio.sleep(retry_time)
+
+def extract_items(data, url, data_key):
+    # Log the structure of the response
+    logger.debug("Response structure for %s: %s", url, data.keys())
+
+    # Extract the relevant data using the provided key
+    items = data.get(data_key, [])
+
+    logger.debug("Extracted %d items from the response for %s", len(items), url)
+    return items
+
+def get_total_count(data):
+    # Look for a total record count in the response, either top-level or under 'pagination'
+    for container in (data, data.get('pagination')):
+        if not isinstance(container, dict):
+            continue
+        for key in TOTAL_COUNT_KEYS:
+            try:
+                return int(container[key])
+            except (KeyError, TypeError, ValueError):
+                pass
+    return None
+
+async def iter_paginated_data(session, url, limiter, data_key, params=None):
     limit = 1000  # Maximum limit allowed by the API
 
-    while True:
+    def page_params(offset):
         current_params = {'pagination.limit': limit, 'pagination.offset': offset}
         if params:
             current_params.update(params)
+        return current_params
 
-        data = await make_request(session, url, semaphore, params=current_params)
-        if not data:
-            break
+    def fetch_pages(offsets):
+        return asyncio.gather(
+            *(make_request(session, url, limiter, params=page_params(o)) for o in offsets)
+        )
 
-        # Log the structure of the response
-        logger.debug(f"Response structure for {url}: {list(data.keys())}")  # Convert dict_keys to list
+    def log_missing(offset):
+        logger.error("Failed to fetch page at offset %d for %s; remaining %s data is missing", offset, url, data_key)
 
-        # Extract the relevant data using the provided key
-        items = data.get(data_key, [])
-        
-        if isinstance(items, dict):
-            items = [items]  # Convert single item to list
-        
-        logger.debug(f"Extracted {len(items)} items from the response for {url}")
-        all_data.extend(items)
+    # The first page tells us whether there is anything more to fetch
+    data = await make_request(session, url, limiter, params=page_params(0))
+    if not data:
+        return
 
-        if len(items) < limit:
-            break
+    items = extract_items(data, url, data_key)
+    if isinstance(items, dict):
+        # The endpoint returned a single item rather than a list, so there is nothing to page through
+        yield [items]
+        return
+    yield items
 
-        offset += limit
+    if len(items) < limit:
+        return
 
-    return all_data
+    total_count = get_total_count(data)
+    if total_count is not None:
+        # The total is known, so request exactly the remaining pages (if any)
+        offsets = list(range(limit, total_count, limit))
+        for start in range(0, len(offsets), PAGE_WINDOW):
+            window = offsets[start:start + PAGE_WINDOW]
+            for offset, data in zip(window, await fetch_pages(window)):
+                if data is None:
+                    log_missing(offset)
+                    return
+                yield extract_items(data, url, data_key)
+        return
 
-async def get_clusters(session, semaphore):
+    # Otherwise speculatively fetch the following pages in windows, stopping at the first short page
+    offset = limit
+    while len(items) == limit:
+        offsets = [offset + i * limit for i in range(PAGE_WINDOW)]
+        for page_offset, data in zip(offsets, await fetch_pages(offsets)):
+            if data is None:
+                log_missing(page_offset)
+                return
+            items = extract_items(data, url, data_key)
+            yield items
+            if len(items) < limit:
+                return
+
+        offset += PAGE_WINDOW * limit
+
+async def get_paginated_data(session, url, limiter, data_key, params=None):
+    pages = [
+        items
+        async for items in iter_paginated_data(session, url, limiter, data_key, params=params)
+    ]
+    return list(itertools.chain.from_iterable(pages))
+
+async def stream_paginated_data(session, url, limiter, data_key, queue, params=None):
+    # Hand pages to the queue as they arrive instead of keeping every record in memory.
+    # The end-of-data sentinel is only sent on success: on failure the task group cancels
+    # the writer, and blocking on a full queue here would keep the group from exiting.
+    count = 0
+    async for items in iter_paginated_data(session, url, limiter, data_key, params=params):
+        await queue.put(items)
+        count += len(items)
+    await queue.put(None)
+    return count
+
+async def write_jsonl(queue, filename):
+    # Single writer draining pages from the queue until the producer sends None
+    count = 0
+    with open(filename, 'wb') as f:
+        while (items := await queue.get()) is not None:
+            for item in items:
+                f.write(orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE))
+            count += len(items)
+    logger.info(f"Saved {count} records to {filename}")
+    return count
+
+async def get_clusters(session, limiter):
     url = urllib.parse.urljoin(BASE_URL, '/v1/clusters')
     logger.info("Fetching clusters")
-    clusters = await get_paginated_data(session, url, semaphore, 'clusters')
+    clusters = await get_paginated_data(session, url, limiter, 'clusters')
     logger.info(f"Fetched {len(clusters)} clusters")
     return clusters
 
-async def get_deployments(session, semaphore):
+async def get_deployments(session, limiter, queue):
     url = urllib.parse.urljoin(BASE_URL, '/v1/deployments')
     logger.info("Fetching deployments")
-    deployments = await get_paginated_data(session, url, semaphore, 'deployments')
-    logger.info(f"Fetched {len(deployments)} deployments")
-    return deployments
+    deployment_count = await stream_paginated_data(session, url, limiter, 'deployments', queue)
+    logger.info(f"Fetched {deployment_count} deployments")
+    return deployment_count
 
-async def get_pods(session, semaphore):
+async def get_pods(session, limiter, queue):
     url = urllib.parse.urljoin(BASE_URL, '/v1/pods')
     logger.info("Fetching pods")
-    pods = await get_paginated_data(session, url, semaphore, 'pods')
-    logger.info(f"Fetched {len(pods)} pods")
-    return pods
+    pod_count = await stream_paginated_data(session, url, limiter, 'pods', queue)
+    logger.info(f"Fetched {pod_count} pods")
+    return pod_count
 
-async def get_namespaces(session, semaphore):
+async def get_namespaces(session, limiter):
     url = urllib.parse.urljoin(BASE_URL, '/v1/namespaces')
     logger.info("Fetching namespaces (this may take a while)")
-    namespaces = await make_request(session, url, semaphore, timeout=NAMESPACES_TIMEOUT)
+    namespaces = await make_request(session, url, limiter, timeout=NAMESPACES_TIMEOUT)
     if namespaces and 'namespaces' in namespaces:
         namespaces = namespaces['namespaces']
     logger.info(f"Fetched {len(namespaces)} namespaces")
     return namespaces
 
-async def get_nodes(session, semaphore, cluster_id):
+async def get_nodes(session, limiter, cluster_id):
     url = urllib.parse.urljoin(BASE_URL, f'/v1/nodes/{cluster_id}')
-    logger.info(f"Fetching nodes for cluster {cluster_id}")
-    nodes = await make_request(session, url, semaphore)
+    logger.debug("Fetching nodes for cluster %s", cluster_id)
+    nodes = await make_request(session, url, limiter)
     return nodes
 
-async def get_images(session, semaphore):
+async def get_images(session, limiter):
     url = urllib.parse.urljoin(BASE_URL, '/v1/images')
     logger.info("Fetching images")
-    images = await get_paginated_data(session, url, semaphore, 'images')
+    images = await get_paginated_data(session, url, limiter, 'images')
     logger.info(f"Fetched {len(images)} images")
     return images
 
-async def search_by_image(session, semaphore, image_name):
+def is_truncated(search_results):
+    # The per-category counts report every match, while the server may cap the results it returns
+    counts = search_results.get('counts')
+    if not counts:
+        return False
+    total = sum(int(count.get('count', 0)) for count in counts)
+    return total > len(search_results.get('results', []))
+
+def split_search_results(image_names, search_results):
+    # Attribute each result of a batched search to the image names it matched. Search terms
+    # match by prefix, so a result belongs to every name that prefixes one of its matched values.
+    by_image = {image_name: [] for image_name in image_names}
+    for result in search_results.get('results', []):
+        matched = set()
+        for field_match in result.get('fieldToMatches', {}).values():
+            matched.update(field_match.get('values', []))
+        if result.get('category') == 'IMAGES':
+            matched.add(result.get('name'))
+        for image_name in image_names:
+            if any(value and value.startswith(image_name) for value in matched):
+                by_image[image_name].append(result)
+
+    # Rebuild the shape of a single-image search response, including per-category counts
+    return {
+        image_name: {
+            'results': results,
+            'counts': [
+                {'category': category, 'count': str(sum(1 for r in results if r.get('category') == category))}
+                for category in SEARCH_CATEGORIES
+            ]
+        }
+        for image_name, results in by_image.items()
+    }
+
+async def search_by_images(session, limiter, image_names):
     url = urllib.parse.urljoin(BASE_URL, '/v1/search')
     params = {
-        'query': f'Image:{image_name}',
-        'categories': ['DEPLOYMENTS', 'IMAGES']
+        'query': 'Image:' + ','.join(image_names),
+        'categories': SEARCH_CATEGORIES
     }
-    logger.info(f"Searching for image: {image_name}")
-    search_results = await make_request(session, url, semaphore, params=params)
-    return image_name, search_results
-
-async def concurrent_image_search(session, semaphore, images):
-    search_tasks = [search_by_image(session, semaphore, image['name']) for image in images]
-    search_results = await asyncio.gather(*search_tasks)
-    return dict(search_results)
-
-async def main():
+    logger.debug("Searching for %d images", len(image_names))
+    search_results = await make_request(session, url, limiter, params=params)
+
+    if len(image_names) == 1:
+        # Same query as an unbatched search, so the response is used as is
+        return {image_names[0]: search_results}
+    if search_results is None:
+        return {image_name: None for image_name in image_names}
+    if is_truncated(search_results):
+        # The server capped the batch, so split it rather than silently losing matches
+        logger.debug("Search results truncated for %d images, splitting the batch", len(image_names))
+        middle = len(image_names) // 2
+        async with asyncio.TaskGroup() as tg:
+            halves = [
+                tg.create_task(search_by_images(session, limiter, half))
+                for half in (image_names[:middle], image_names[middle:])
+            ]
+        return {**halves[0].result(), **halves[1].result()}
+    return split_search_results(image_names, search_results)
+
+async def concurrent_image_search(session, limiter, images):
+    # The same image is usually shared by many deployments, so search each name only once
+    image_names = list(dict.fromkeys(image['name'] for image in images))
+    batches = [
+        image_names[i:i + IMAGE_SEARCH_BATCH_SIZE]
+        for i in range(0, len(image_names), IMAGE_SEARCH_BATCH_SIZE)
+    ]
+    async with asyncio.TaskGroup() as tg:
+        search_tasks = [tg.create_task(search_by_images(session, limiter, batch)) for batch in batches]
+    search_results = {}
+    for task in search_tasks:
+        search_results.update(task.result())
+    return search_results
+
+async def main(pretty=False):
     if not all([BASE_URL, API_TOKEN]):
         logger.error("Missing required environment variables. Please check your .env file.")
         return
 
     logger.info(f"Starting script execution. Connecting to API at: {BASE_URL}")
 
-    async with aiohttp.ClientSession() as session:
-        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
-
-        # Fetch clusters, namespaces, deployments, and pods concurrently
-        clusters_task = get_clusters(session, semaphore)
-        namespaces_task = get_namespaces(session, semaphore)
-        deployments_task = get_deployments(session, semaphore)
-        pods_task = get_pods(session, semaphore)
-        images_task = get_images(session, semaphore)
-
-        clusters, namespaces, deployments, pods, images = await asyncio.gather(
-            clusters_task, namespaces_task, deployments_task, pods_task, images_task
-        )
+    # Keep connections alive and cache DNS lookups across the many requests to the same host
+    connector = aiohttp.TCPConnector(
+        limit=CONNECTION_LIMIT,
+        limit_per_host=CONNECTION_LIMIT_PER_HOST,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        ssl=ssl.create_default_context() if VERIFY_SSL else False  # One context shared by all connections
+    )
+    async with aiohttp.ClientSession(connector=connector, headers=headers) as session:
+        limiter = AdaptiveLimiter(MAX_CONCURRENT_REQUESTS)
+
+        # Deployments and pods are streamed to JSONL files while they are being fetched
+        deployments_queue = asyncio.Queue(maxsize=PAGE_WINDOW)
+        pods_queue = asyncio.Queue(maxsize=PAGE_WINDOW)
+
+        # Fetch clusters, namespaces, deployments, and pods concurrently;
+        # a failing fetch cancels its siblings instead of letting them keep retrying
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(write_jsonl(deployments_queue, 'deployments.jsonl'))
+            tg.create_task(write_jsonl(pods_queue, 'pods.jsonl'))
+            clusters_task = tg.create_task(get_clusters(session, limiter))
+            namespaces_task = tg.create_task(get_namespaces(session, limiter))
+            deployments_task = tg.create_task(get_deployments(session, limiter, deployments_queue))
+            pods_task = tg.create_task(get_pods(session, limiter, pods_queue))
+            images_task = tg.create_task(get_images(session, limiter))
+
+        clusters = clusters_task.result()
+        namespaces = namespaces_task.result()
+        deployment_count = deployments_task.result()
+        pod_count = pods_task.result()
+        images = images_task.result()
+
+        # Fetch nodes for each cluster concurrently
+        async with asyncio.TaskGroup() as tg:
+            node_tasks = {
+                cluster['id']: tg.create_task(get_nodes(session, limiter, cluster['id']))
+                for cluster in clusters
+            }
+        nodes = {cluster_id: task.result() for cluster_id, task in node_tasks.items()}
 
-        # Fetch nodes for each cluster
-        nodes = {}
-        for cluster in clusters:
-            cluster_id = cluster['id']
-            nodes[cluster_id] = await get_nodes(session, semaphore, cluster_id)
-        
         # Perform concurrent search for all images
         logger.info("Starting concurrent image searches")
         search_start_time = datetime.now()
-        search_results = await concurrent_image_search(session, semaphore, images)
+        search_results = await concurrent_image_search(session, limiter, images)
         search_end_time = datetime.now()
         search_execution_time = search_end_time - search_start_time
         logger.info(f"Concurrent image searches completed. Execution time: {search_execution_time}")
 
-        # Save results to JSON files
+        # Save results to JSON files, compact unless pretty output was requested
+        json_option = orjson.OPT_INDENT_2 if pretty else 0
+
         def save_to_json(data, filename, data_key):
-            with open(filename, 'w') as f:
-                json.dump({data_key: data}, f, indent=2)
+            with open(filename, 'wb') as f:
+                f.write(orjson.dumps({data_key: data}, option=json_option))
             logger.info(f"Saved {data_key} data to {filename}. Total {data_key}: {len(data)}")
 
         save_to_json(clusters, 'clusters.json', 'clusters')
         save_to_json(namespaces, 'namespaces.json', 'namespaces')
-        save_to_json(deployments, 'deployments.json', 'deployments')
-        save_to_json(pods, 'pods.json', 'pods')
         save_to_json(images, 'images.json', 'images')
 
         # Save nodes data
-        with open('nodes.json', 'w') as f:
-            json.dump(nodes, f, indent=2)
+        with open('nodes.json', 'wb') as f:
+            f.write(orjson.dumps(nodes, option=json_option))
         logger.info("Saved nodes data to nodes.json")
 
         # Save search results
-        with open('search_results.json', 'w') as f:
-            json.dump(search_results, f, indent=2)
+        with open('search_results.json', 'wb') as f:
+            f.write(orjson.dumps(search_results, option=json_option))
         logger.info("Saved search results to search_results.json")
 
         # Log summary
         logger.info(f"Total clusters: {len(clusters)}")
         logger.info(f"Total nodes: {sum(len(n.get('nodes', [])) for n in nodes.values())}")
         logger.info(f"Total namespaces: {len(namespaces)}")
-        logger.info(f"Total deployments: {len(deployments)}")
-        logger.info(f"Total pods: {len(pods)}")
+        logger.info(f"Total deployments: {deployment_count}")
+        logger.info(f"Total pods: {pod_count}")
         logger.info(f"Total images: {len(images)}")
         logger.info(f"Total image searches: {len(search_results)}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch Kubernetes data from the StackRox API")
+    parser.add_argument('--pretty', action='store_true', help="indent the JSON output files for debugging")
+    args = parser.parse_args()
+
     logger.info("Script execution started")
+    if uvloop is not None:
+        # libuv-based event loop for faster socket handling
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     start_time = datetime.now()
-    asyncio.run(main())
+    asyncio.run(main(pretty=args.pretty))
     end_time = datetime.now()
     execution_time = end_time - start_time
     logger.info(f"Script execution completed. Total execution time: {execution_time}")